@@ -1,5 +1,7 @@
+import os
 import typing
 from typing import Optional
+from urllib.parse import urlparse
 
 import requests
 
@@ -7,10 +9,16 @@ import requests
 class ProxyChecker:
     """A class to test proxy configuration."""
 
+    REQUEST_TIMEOUT: float = 5.0
+
     def test_proxy(self) -> None:
         """Test the proxy configuration."""
         print(" 💡 Current public IP (before setting up proxy): ", self._get_current_public_ip())
-        config = self._get_proxy_config()
+        try:
+            config = self._get_proxy_config()
+        except ValueError as e:
+            print(f" ❌ Invalid proxy: {e}")
+            return
         print(" 💡 Current public IP (after setting up proxy): ", self._get_current_public_ip(config))
 
     def _get_current_public_ip(self, proxy: typing.Optional[dict] = None) -> Optional[str]:
@@ -20,38 +28,72 @@ class ProxyChecker:
         :return Optional[str]: The current public ip, None if fails
         """
         try:
-            params = {"url": "https://ifconfig.me"}
-            if proxy:
-                params["proxies"] = proxy
-            response = requests.get(**params)
-            return response.text.strip()
+            response = requests.get("https://ifconfig.me", proxies=proxy, timeout=self.REQUEST_TIMEOUT)
         except requests.RequestException as e:
             print(f" ❌ Error fetching public IP: {e}")
             return None
+        return response.text.strip()
 
     def _get_proxy_config(self) -> dict:
         """Set up proxy configuration for requests.
 
+        The proxy is read from the DELPHA_PROXY_URL environment variable when set, otherwise from a single
+        host:port[:username:password] prompt, falling back to one prompt per field on blank input.
+
         :return dict: The proxy settings
+        :raises ValueError: If the proxy is malformed or its port is missing or invalid
         """
+        env_url = os.environ.get("DELPHA_PROXY_URL")
+        if env_url:
+            parsed = urlparse(env_url if "://" in env_url else f"http://{env_url}")
+            try:
+                port = parsed.port
+            except ValueError:
+                port = None
+            if not parsed.hostname or not port:
+                raise ValueError("DELPHA_PROXY_URL needs a host and a port between 1 and 65535")
+            return self._build_proxy_config(parsed.hostname, port, parsed.username, parsed.password)
+
+        raw = input(" ▶️ Enter proxy as host:port[:username:password] (leave blank to fill step by step): ").strip()
+        if raw:
+            fields = raw.split(":", 3)
+            if len(fields) not in (2, 4) or not fields[0]:
+                raise ValueError("expected host:port or host:port:username:password")
+            proxy_host, proxy_port, *credentials = fields
+            username, password = credentials or ("", "")
+            return self._build_proxy_config(proxy_host, self._parse_port(proxy_port), username, password)
 
         proxy_host = input(" ▶️ Enter proxy host: ")
-        proxy_port = int(input(" ▶️ Enter proxy port: "))
+        proxy_port = self._parse_port(input(" ▶️ Enter proxy port: "))
         username = input(" ▶️ Enter username (leave blank if none): ")
         password = input(" ▶️ Enter password (leave blank if none): ")
-        proxies = {
-            "http": (
-                f"http://{username}:{password}@{proxy_host}:{proxy_port}"
-                if username != "" and password != ""
-                else f"http://{proxy_host}:{proxy_port}"
-            ),
-            "https": (
-                f"http://{username}:{password}@{proxy_host}:{proxy_port}"
-                if username != "" and password != ""
-                else f"http://{proxy_host}:{proxy_port}"
-            ),
-        }
-        return proxies
+        return self._build_proxy_config(proxy_host, proxy_port, username, password)
+
+    def _parse_port(self, value: str) -> int:
+        """Parse a proxy port.
+
+        :param str value: The port as typed
+        :return int: The port
+        :raises ValueError: If the port is not a number between 1 and 65535
+        """
+        if not value.strip().isdigit() or not 0 < int(value) < 65536:
+            raise ValueError(f"the port must be a number between 1 and 65535, got {value!r}")
+        return int(value)
+
+    def _build_proxy_config(
+        self, proxy_host: str, proxy_port: int, username: Optional[str], password: Optional[str]
+    ) -> dict:
+        """Build the requests proxy settings for a proxy address.
+
+        :param str proxy_host: The proxy host
+        :param int proxy_port: The proxy port
+        :param Optional[str] username: The proxy username, None or blank if none
+        :param Optional[str] password: The proxy password, None or blank if none
+        :return dict: The proxy settings
+        """
+        auth = f"{username}:{password}@" if username and password else ""
+        proxy_url = f"http://{auth}{proxy_host}:{proxy_port}"
+        return {"http": proxy_url, "https": proxy_url}
 
 
 def check():
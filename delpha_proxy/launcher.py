@@ -1,7 +1,14 @@
+import argparse
+
 from delpha_proxy.server import ProxyServer
 
 
 def setup_server_proxy():
     """Launch the proxy server"""
-    proxy_server = ProxyServer()
+    parser = argparse.ArgumentParser(description="Set up a proxy server")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Number of processes accepting connections on the port (default: 1)"
+    )
+    args = parser.parse_args()
+    proxy_server = ProxyServer(worker_processes=max(args.workers, 1))
     proxy_server.start_server()
@@ -1,46 +1,281 @@
 import base64
+import collections
+import concurrent.futures
+import errno
+import functools
 import hashlib
+import ipaddress
 import logging
 import os
-import platform
+import queue
+import re
 import select
+import selectors
+import signal
 import socket
 import sqlite3
-import subprocess
 import sys
 import threading
 import time
-import traceback
-from typing import Any, Optional, Tuple, TypeAlias
-
-import requests
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple, TypeAlias
 
 _RetAddress: TypeAlias = Any
 
+# Linux only, tells the kernel more data follows so it can hold back a partial segment
+MSG_MORE = getattr(socket, "MSG_MORE", 0)
+
+# Linux 4.11+, not exposed by the socket module
+TCP_FASTOPEN_CONNECT = getattr(socket, "TCP_FASTOPEN_CONNECT", 30)
+
+
+class TunnelBuffer:
+    """A preallocated buffer holding the bytes read from one tunnel end until the other end accepts them."""
+
+    def __init__(self, size: int = 64 * 1024) -> None:
+        """Allocate the buffer once for the whole life of the tunnel.
+
+        :param int size: The buffer capacity in bytes, defaults to 64 KiB
+        """
+        self._data = bytearray(size)
+        self._view = memoryview(self._data)
+        self._start = 0
+        self._end = 0
+        # Whether the last fill stopped because the buffer was full rather than because the socket was drained
+        self.saturated = False
+
+    @property
+    def pending(self) -> int:
+        """The number of bytes read but not sent yet."""
+        return self._end - self._start
+
+    @property
+    def full(self) -> bool:
+        """Whether no more bytes can be read before the buffer is flushed."""
+        return self._end == len(self._data)
+
+    def load(self, data: bytes) -> None:
+        """Queue bytes that did not come from the tunnel socket itself.
+
+        :param bytes data: The bytes to queue, they must fit in the free space of the buffer
+        """
+        self._view[self._end : self._end + len(data)] = data
+        self._end += len(data)
+
+    def fill(self, sock: socket.socket) -> bool:
+        """Read everything available on a non-blocking socket, up to the buffer capacity.
+
+        :param socket.socket sock: The socket to read from
+        :return bool: False if the socket reached the end of the stream
+        """
+        self.saturated = False
+        while self._end < len(self._data):
+            try:
+                received = sock.recv_into(self._view[self._end :])
+            except BlockingIOError:
+                return True
+            if not received:
+                return False
+            self._end += received
+        self.saturated = True
+        return True
+
+    def flush(self, sock: socket.socket, more: bool = False) -> None:
+        """Write as many pending bytes as a non-blocking socket accepts.
+
+        :param socket.socket sock: The socket to write to
+        :param bool more: Whether more data is known to follow, defaults to False
+        """
+        flags = MSG_MORE if more else 0
+        while self._start < self._end:
+            try:
+                self._start += sock.send(self._view[self._start : self._end], flags)
+            except BlockingIOError:
+                return
+        self._start = self._end = 0
+
+    def close(self) -> None:
+        """Release the buffer resources, nothing to do for a user space buffer."""
+
+
+class SpliceBuffer:
+    """A kernel pipe holding the bytes read from one tunnel end, moved with splice(2) without a user space copy."""
+
+    PIPE_SIZE: int = 64 * 1024
+
+    def __init__(self) -> None:
+        """Create the non-blocking pipe used for the whole life of the tunnel."""
+        self._read_fd, self._write_fd = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+        self._pending = 0
+        # Pipes count pages rather than bytes, so they may refuse data before PIPE_SIZE bytes are queued
+        self._stalled = False
+        # Whether the last fill stopped because the pipe was full rather than because the socket was drained
+        self.saturated = False
+
+    @property
+    def pending(self) -> int:
+        """The number of bytes read but not sent yet."""
+        return self._pending
+
+    @property
+    def full(self) -> bool:
+        """Whether no more bytes can be read before the pipe is flushed."""
+        return self._stalled or self._pending >= self.PIPE_SIZE
+
+    def fill(self, sock: socket.socket) -> bool:
+        """Move everything available on a non-blocking socket into the pipe, up to its capacity.
+
+        :param socket.socket sock: The socket to read from
+        :return bool: False if the socket reached the end of the stream
+        """
+        self.saturated = False
+        while not self.full:
+            try:
+                moved = os.splice(sock.fileno(), self._write_fd, self.PIPE_SIZE - self._pending, flags=os.SPLICE_F_MOVE)
+            except BlockingIOError:
+                # An empty pipe cannot be full, otherwise the socket may be drained or the pipe out of pages
+                self._stalled = self._pending > 0
+                return True
+            if not moved:
+                return False
+            self._pending += moved
+        self.saturated = True
+        return True
+
+    def flush(self, sock: socket.socket, more: bool = False) -> None:
+        """Move as many pending bytes to a non-blocking socket as it accepts.
+
+        :param socket.socket sock: The socket to write to
+        :param bool more: Whether more data is known to follow, defaults to False
+        """
+        flags = os.SPLICE_F_MOVE | (os.SPLICE_F_MORE if more else 0)
+        while self._pending:
+            try:
+                self._pending -= os.splice(self._read_fd, sock.fileno(), self._pending, flags=flags)
+            except BlockingIOError:
+                return
+            self._stalled = False
+
+    def load(self, data: bytes) -> None:
+        """Queue bytes that did not come from the tunnel socket itself.
+
+        :param bytes data: The bytes to queue, they must fit in the free space of the pipe
+        """
+        view = memoryview(data)
+        while view:
+            written = os.write(self._write_fd, view)
+            self._pending += written
+            view = view[written:]
+
+    def close(self) -> None:
+        """Close both ends of the pipe."""
+        os.close(self._read_fd)
+        os.close(self._write_fd)
+
+
+@dataclass(eq=False)
+class TunnelPair:
+    """The two ends of an established CONNECT tunnel and the bytes in flight between them."""
+
+    client_sock: socket.socket
+    upstream_sock: socket.socket
+    buf_c2s: TunnelBuffer | SpliceBuffer
+    buf_s2c: TunnelBuffer | SpliceBuffer
+    # "open", then "closing" after an end reached EOF or "failed" after an error, and "closed" once released
+    state: str = "open"
+
 
 class ProxyServer:
     """Allows to create a proxy server"""
 
-    def __init__(self) -> None:
-        """Initialize the proxy server with a public IP and a database for users."""
+    SOCKET_BUFFER_SIZE: int = 4 * 1024 * 1024
+    AUTH_CACHE_SIZE: int = 1024
+    AUTH_CACHE_TTL: float = 300.0
+    SCRYPT_PREFIX: str = "s1$"
+    PUBLIC_IP_CACHE_TTL: float = 3600.0
+    MAX_WORKERS: int = 256
+    REQUEST_TIMEOUT: float = 10.0
+    RELAY_TIMEOUT: float = 60.0
+    DNS_CACHE_TTL: float = 60.0
+    DNS_CACHE_SIZE: int = 1024
+    UPSTREAM_POOL_SIZE: int = 16
+    UPSTREAM_POOL_TOTAL: int = 64
+    UPSTREAM_IDLE_TIMEOUT: float = 30.0
+    HOUSEKEEPING_INTERVAL: float = 1.0
+    MAX_OPEN_FILES: int = 65536
+    SPLICE_PIPE_POOL_SIZE: int = 8
+    MAX_HEADER_SIZE: int = 64 * 1024
+    RECV_SIZE: int = 64 * 1024
+    AUTH_REQUIRED_REPLY: bytes = (
+        b"HTTP/1.1 407 Proxy Authentication Required\r\n" b'Proxy-Authenticate: Basic realm="Proxy"\r\n\r\n'
+    )
+    CONNECT_REPLY: bytes = b"HTTP/1.1 200 Connection Established\r\n\r\n"
+    PROXY_AUTHORIZATION_PATTERN: re.Pattern = re.compile(rb"(?mi)^Proxy-Authorization:[ \t]*Basic[ \t]+(\S+)")
+    CONTENT_LENGTH_PATTERN: re.Pattern = re.compile(rb"(?mi)^Content-Length:[ \t]*(\d+)")
+    TRANSFER_ENCODING_PATTERN: re.Pattern = re.compile(rb"(?mi)^Transfer-Encoding:")
+    # Method, then the target host and optional port from either an authority or an absolute URL
+    REQUEST_LINE_PATTERN: re.Pattern = re.compile(
+        rb"^([A-Z]+) (?:[A-Za-z][A-Za-z0-9+.-]*://)?([^\s/:]+)(?::(\d+))?\S* HTTP/"
+    )
+
+    def __init__(self, worker_processes: int = 1) -> None:
+        """Initialize the proxy server with a public IP and a database for users.
+
+        :param int worker_processes: The number of processes accepting connections on the port, defaults to 1
+        """
         self.public_host: str = self._get_public_ip()
         self.local_host: str = self._get_local_ip()
         self.port: Optional[int] = None
+        self.worker_processes: int = worker_processes
+        if worker_processes > 1 and not (hasattr(os, "fork") and hasattr(socket, "SO_REUSEPORT")):
+            self.log("Worker processes are not supported on the current platform, using one.", "cli", "warning")
+            self.worker_processes = 1
 
         base_folder = os.path.expanduser("~")
         os.makedirs(base_folder, exist_ok=True)
         self.db_path: str = os.path.join(base_folder, "users.db")
         self.log_path: str = os.path.join(base_folder, "server.log")
+        self._auth_conn: Optional[sqlite3.Connection] = None
+        self._auth_lock = threading.Lock()
+        self._auth_cache: collections.OrderedDict[bytes, float] = collections.OrderedDict()
+        self._auth_cache_lock = threading.Lock()
+        self._dns: dict[str, Tuple[str, float]] = {}
+        self._upstream_pool: dict[Tuple[str, int], collections.deque[Tuple[socket.socket, float]]] = {}
+        self._upstream_pooled = 0
+        self._upstream_pool_lock = threading.Lock()
+        # Pipes hold two descriptors each and may take up to a quarter of the open file limit
+        self._splice_slots = threading.Semaphore(self._raise_open_file_limit() // 8)
+        self._splice_pipes: queue.LifoQueue[Tuple[int, int]] = queue.LifoQueue(self.SPLICE_PIPE_POOL_SIZE)
+        self._buffer_options = self._socket_buffer_options()
+        self._log_tail_stop: Optional[threading.Event] = None
 
-        logging.basicConfig(
-            filename=self.log_path, level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-        )
+        self._workers = concurrent.futures.ThreadPoolExecutor(max_workers=self.MAX_WORKERS, thread_name_prefix="proxy")
+        self._create_event_loop()
+        self._commands: dict[str, Callable[[], None]] = {
+            "add-user": self._execute_add_user_command,
+            "show-logs": self._show_logs,
+            "hide-logs": self._hide_logs,
+            "exit": self._cleanup_and_exit,
+        }
+
+        # Skip the thread and process lookups done for every record, the format does not use them
+        logging.logThreads = False
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s", validate=False)
+        formatter.default_msec_format = None
+        log_handler = logging.FileHandler(self.log_path)
+        log_handler.setFormatter(formatter)
+        logging.basicConfig(level=logging.INFO, handlers=[log_handler])
 
     def start_server(self) -> None:
         """Start the server and manage its lifecycle, including port forwarding setup confirmation."""
         self._configure()
         server_socket = self._start_socket()
         if server_socket:
+            self._spawn_worker_processes(server_socket)
+            if self.authentication:
+                self._connect_auth_database()
             handle_connections_thread = threading.Thread(target=self._handle_connections, args=(server_socket,))
             handle_connections_thread.daemon = True
             handle_connections_thread.start()
@@ -71,6 +306,8 @@ class ProxyServer:
             self.authentication = True
         else:
             self.authentication = False
+            # Decided once here rather than on every request
+            self._is_authenticated = lambda request_header: True
 
     def _setup_database(self) -> None:
         """Set up the SQLite database for storing user credentials."""
@@ -82,6 +319,17 @@ class ProxyServer:
             )
             conn.commit()
 
+    def _connect_auth_database(self) -> None:
+        """Open the long-lived read-only connection used to authenticate requests.
+
+        The connection is shared by the request threads under a lock, so the lookup statement stays compiled in
+        its statement cache instead of being recompiled on a fresh connection for every request.
+        """
+        self._auth_conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._auth_conn.execute("PRAGMA journal_mode=WAL")
+        self._auth_conn.execute("PRAGMA query_only=1")
+        self._auth_conn.execute("PRAGMA cache_size=-2000")
+
     def _configure_port(self) -> None:
         """Configure the server port."""
         while True:
@@ -135,9 +383,7 @@ class ProxyServer:
         """
         while True:
             try:
-                server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                server_socket.bind(("0.0.0.0", self.port))
-                server_socket.listen(5)
+                server_socket = self._bind_socket()
                 self.log(str(self), "cli")
                 self.log(f"\n\n 🟩 Server started on port {self.port}. Waiting for connections..", "server")
                 self.log(f"\n\n 🟩 Server started on port {self.port}. Enter show-logs to see details", "cli")
@@ -146,15 +392,202 @@ class ProxyServer:
                 self.log(f"Error starting server on port {self.port}: {e}.", "cli", "error")
                 self._configure_port()
 
+    def _bind_socket(self) -> socket.socket:
+        """Create the socket listening on the configured port.
+
+        :return socket.socket: The listening socket
+        """
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            if self.worker_processes > 1:
+                # Every process binds its own socket to the port and the kernel spreads the connections between them
+                server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            server_socket.bind(("0.0.0.0", self.port))
+            # Accepted client sockets inherit the buffer sizes and TCP_NODELAY from the listening socket
+            self._tune_socket(server_socket)
+            server_socket.listen(5)
+        except BaseException:
+            server_socket.close()
+            raise
+        return server_socket
+
+    def _spawn_worker_processes(self, server_socket: socket.socket) -> None:
+        """Fork the extra processes accepting connections, each running its own event loop on its own socket.
+
+        The workers share the read end of a pipe whose only write end stays in this process, so they exit as soon
+        as it does.
+
+        :param socket.socket server_socket: The listening socket of this process
+        """
+        if self.worker_processes < 2:
+            return
+        lifeline_read, self._lifeline_write = os.pipe()
+        for _ in range(self.worker_processes - 1):
+            if os.fork() == 0:
+                try:
+                    signal.signal(signal.SIGINT, signal.SIG_IGN)
+                    os.close(self._lifeline_write)
+                    server_socket.close()
+                    self._selector.close()
+                    self._wakeup_recv.close()
+                    self._wakeup_send.close()
+                    self._create_event_loop()
+                    self._selector.register(lifeline_read, selectors.EVENT_READ, lambda _: os._exit(0))
+                    if self.authentication:
+                        self._connect_auth_database()
+                    self._handle_connections(self._bind_socket())
+                except Exception as e:
+                    self.log(f"Worker process {os.getpid()} failed: {e}", "server", "error", exc_info=True)
+                finally:
+                    os._exit(1)
+        os.close(lifeline_read)
+
+    def _raise_open_file_limit(self) -> int:
+        """Raise the soft limit on open files up to the hard limit, at most MAX_OPEN_FILES.
+
+        Every tunnel holds two sockets and up to two pipes, so the common default of 1024 is quickly reached.
+
+        :return int: The soft limit in force
+        """
+        try:
+            import resource
+        except ImportError:
+            return 512  # Windows, where the C runtime allows 512 open files by default
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft == resource.RLIM_INFINITY:
+            return self.MAX_OPEN_FILES
+        target = self.MAX_OPEN_FILES if hard == resource.RLIM_INFINITY else min(hard, self.MAX_OPEN_FILES)
+        if soft < target:
+            try:
+                resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+                soft = target
+            except (ValueError, OSError):
+                pass  # Some systems refuse limits above their own maximum, keep the current one
+        return soft
+
+    def _socket_buffer_options(self) -> list[Tuple[int, int]]:
+        """Choose the socket buffer sizes worth setting explicitly.
+
+        Setting a buffer size turns off the kernel autotuning of that buffer, and the size is capped by
+        net.core.rmem_max or net.core.wmem_max. On stock kernels that cap is far below what autotuning reaches
+        (net.ipv4.tcp_rmem and net.ipv4.tcp_wmem), so a fixed size would shrink the TCP window on long fat
+        links. A size is only set where the cap allows more than autotuning, and never when the limits are
+        unknown.
+
+        :return list[Tuple[int, int]]: The socket options and sizes to set
+        """
+        options = []
+        for option, cap_path, autotuning_path in (
+            (socket.SO_RCVBUF, "/proc/sys/net/core/rmem_max", "/proc/sys/net/ipv4/tcp_rmem"),
+            (socket.SO_SNDBUF, "/proc/sys/net/core/wmem_max", "/proc/sys/net/ipv4/tcp_wmem"),
+        ):
+            try:
+                with open(cap_path) as cap_file, open(autotuning_path) as autotuning_file:
+                    cap = int(cap_file.read())
+                    autotuning_max = int(autotuning_file.read().split()[-1])
+            except (OSError, ValueError, IndexError):
+                continue
+            # The kernel caps the requested size, then doubles it for its own bookkeeping
+            if 2 * min(self.SOCKET_BUFFER_SIZE, cap) > autotuning_max:
+                options.append((option, self.SOCKET_BUFFER_SIZE))
+        return options
+
+    def _tune_socket(self, sock: socket.socket) -> None:
+        """Disable Nagle's algorithm on a socket, and enlarge its kernel buffers where it beats autotuning.
+
+        :param socket.socket sock: The socket to tune, before it is connected or listening
+        """
+        for option, size in self._buffer_options:
+            sock.setsockopt(socket.SOL_SOCKET, option, size)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _create_event_loop(self) -> None:
+        """Create the selector of the event loop and the socket pair used to wake it up."""
+        self._selector = selectors.DefaultSelector()
+        self._pending_tunnels: queue.SimpleQueue[TunnelPair] = queue.SimpleQueue()
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_send.setblocking(False)
+        # Accepted connections waiting for their request, with the time they are dropped at, oldest first
+        self._idle_clients: dict[socket.socket, float] = {}
+        # The listening socket while accepting is paused after running out of file descriptors
+        self._paused_listener: Optional[socket.socket] = None
+        self._accept_error_logged = False
+
     def _handle_connections(self, server_socket: socket.socket) -> None:
-        """Handle incoming client connections.
+        """Run the event loop accepting client connections and relaying established tunnels.
 
         :param socket.socket server_socket: The socket client on which listen for incoming connections
         """
+        server_socket.setblocking(False)
+        self._wakeup_recv.setblocking(False)
+        self._selector.register(server_socket, selectors.EVENT_READ, self._accept_connections)
+        self._selector.register(self._wakeup_recv, selectors.EVENT_READ, self._register_pending_tunnels)
+        next_housekeeping = time.monotonic() + self.HOUSEKEEPING_INTERVAL
         while True:
-            client_socket, client_address = server_socket.accept()
+            for key, events in self._selector.select(self.HOUSEKEEPING_INTERVAL):
+                if isinstance(key.data, TunnelPair):
+                    self._relay_tunnel(key.fileobj, key.data, events)
+                else:
+                    key.data(key.fileobj)
+            if time.monotonic() >= next_housekeeping:
+                self._housekeeping()
+                next_housekeeping = time.monotonic() + self.HOUSEKEEPING_INTERVAL
+
+    def _housekeeping(self) -> None:
+        """Drop what stayed idle for too long and resume a paused accept, run from the event loop periodically."""
+        now = time.monotonic()
+        with self._upstream_pool_lock:
+            expired = self._evict_idle_upstreams(now)
+        for sock in expired:
+            sock.close()
+        for client_socket, deadline in list(self._idle_clients.items()):
+            if deadline > now:
+                break
+            del self._idle_clients[client_socket]
+            self._selector.unregister(client_socket)
+            client_socket.close()
+        if self._paused_listener:
+            self._selector.register(self._paused_listener, selectors.EVENT_READ, self._accept_connections)
+            self._paused_listener = None
+
+    def _accept_connections(self, server_socket: socket.socket) -> None:
+        """Accept every pending client connection and watch it until its request arrives.
+
+        Connections opened ahead of time and left idle, as browsers do, wait in the event loop instead of
+        holding a worker thread, for at most REQUEST_TIMEOUT seconds. Once out of file descriptors, accepting is
+        paused until the next housekeeping rather than retried in a busy loop.
+
+        :param socket.socket server_socket: The listening socket reported as readable
+        """
+        while True:
+            try:
+                client_socket, client_address = server_socket.accept()
+            except BlockingIOError:
+                return
+            except OSError as e:
+                if e.errno in (errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM):
+                    self._selector.unregister(server_socket)
+                    self._paused_listener = server_socket
+                    if self._accept_error_logged:
+                        return
+                    self._accept_error_logged = True
+                self.log(f"Error accepting connection: {e}", "server", "error")
+                return
+            self._accept_error_logged = False
             self.log(f" 💻 Connection attempt from {client_address}.", "server")
-            threading.Thread(target=self._process_client_request, args=(client_socket, client_address)).start()
+            self._idle_clients[client_socket] = time.monotonic() + self.REQUEST_TIMEOUT
+            dispatch = functools.partial(self._dispatch_request, client_address=client_address)
+            self._selector.register(client_socket, selectors.EVENT_READ, dispatch)
+
+    def _dispatch_request(self, client_socket: socket.socket, client_address: _RetAddress) -> None:
+        """Queue the request of a client connection that became readable to the worker threads.
+
+        :param socket.socket client_socket: The socket from which is coming the request
+        :param _RetAddress client_address: The client ip address
+        """
+        del self._idle_clients[client_socket]
+        self._selector.unregister(client_socket)
+        self._workers.submit(self._process_client_request, client_socket, client_address)
 
     def _process_client_request(self, client_socket: socket.socket, client_address: _RetAddress) -> None:
         """Process an individual client request.
@@ -162,38 +595,63 @@ class ProxyServer:
         :param socket.socket client_socket: The socket from which is coming the request
         :param _RetAddress client_address: The client ip address
         """
+        tunnelled = False
         try:
-            request_header = client_socket.recv(1024).decode(errors="ignore")
-            if self._is_authenticated(request_header):
-                if request_header.startswith("CONNECT"):
-                    self._handle_https(request_header, client_socket)
-                else:
-                    self._handle_http(request_header, client_socket)
-            else:
+            client_socket.settimeout(self.REQUEST_TIMEOUT)
+            request_header = client_socket.recv(1024)
+            client_socket.settimeout(self.RELAY_TIMEOUT)
+            if not self._is_authenticated(request_header):
                 self._request_authentication(client_socket)
+                return
+            request_line = self.REQUEST_LINE_PATTERN.match(request_header)
+            if not request_line:
+                self.log(f"Malformed request from {client_address}: {request_header[:80]!r}", "server", "error")
+                return
+            method, host, port = request_line.groups()
+            if method == b"CONNECT":
+                early_data = request_header.partition(b"\r\n\r\n")[2]
+                tunnelled = self._handle_https(host.decode(), int(port or 443), client_socket, early_data)
+            else:
+                self._handle_http(request_header, host.decode(), int(port or 80), client_socket)
         except Exception as e:
-            self.log(
-                f"Error processing request from {client_address}: {e}\n{traceback.format_exc()}", "server", "error"
-            )
+            self.log(f"Error processing request from {client_address}: {e}", "server", "error", exc_info=True)
         finally:
-            client_socket.close()
+            if not tunnelled:
+                client_socket.close()
 
-    def _is_authenticated(self, request_header: str) -> bool:
+    def _is_authenticated(self, request_header: bytes) -> bool:
         """Check if the request contains valid authentication.
 
-        :param str request_header: The header of the incoming request
+        :param bytes request_header: The header of the incoming request
         :return bool: True if the requests is authenticated
         """
-        if not self.authentication:
-            return True
-        if "Proxy-Authorization" in request_header:
-            auth_header = next((line for line in request_header.split("\r\n") if "Proxy-Authorization" in line), None)
-            if auth_header:
-                auth_type, auth_credentials = auth_header.split(" ")[1:]
-                if auth_type.lower() == "basic":
-                    username, password = base64.b64decode(auth_credentials).decode().split(":")
-                    return self._authenticate_user(username, password)
-        return False
+        auth_header = self.PROXY_AUTHORIZATION_PATTERN.search(request_header)
+        return bool(auth_header) and self._check_credentials(auth_header.group(1))
+
+    def _check_credentials(self, auth_credentials: bytes) -> bool:
+        """Verify basic authentication credentials, reusing recent successes to skip the password hashing.
+
+        Rejections are not cached, they would keep refusing a user added since, in every worker process.
+
+        :param bytes auth_credentials: The base64 encoded username:password pair
+        :return bool: True if the credentials match a user
+        """
+        key = hashlib.sha256(auth_credentials).digest()
+        now = time.monotonic()
+        with self._auth_cache_lock:
+            authenticated_at = self._auth_cache.get(key)
+            if authenticated_at and now - authenticated_at < self.AUTH_CACHE_TTL:
+                self._auth_cache.move_to_end(key)
+                return True
+        username, _, password = base64.b64decode(auth_credentials).decode().partition(":")
+        if not self._authenticate_user(username, password):
+            return False
+        with self._auth_cache_lock:
+            self._auth_cache[key] = now
+            self._auth_cache.move_to_end(key)
+            if len(self._auth_cache) > self.AUTH_CACHE_SIZE:
+                self._auth_cache.popitem(last=False)
+        return True
 
     def _request_authentication(self, client_socket: socket.socket) -> None:
         """Request client for authentication.
@@ -201,98 +659,516 @@ class ProxyServer:
         :param socket.socket client_socket: The socker from which is coming the unauthorized request
         """
         self.log(f" 🚩 Request not authenticated, rejected", "server")
-        client_socket.sendall(
-            b"HTTP/1.1 407 Proxy Authentication Required\r\n" b'Proxy-Authenticate: Basic realm="Proxy"\r\n\r\n'
-        )
+        client_socket.sendall(self.AUTH_REQUIRED_REPLY)
 
-    def _handle_http(self, request_header: str, client_socket: socket.socket) -> None:
+    def _handle_http(self, request_header: bytes, server: str, port: int, client_socket: socket.socket) -> None:
         """Handle HTTP requests.
 
-        :param str request_header: The header of the incoming http request
+        Connections to the target are kept open and reused by later requests when the response allows it.
+
+        :param bytes request_header: The header of the incoming http request
+        :param str server: The target host
+        :param int port: The target port
         :param socket.socket client_socket: The socker from which is coming the request
         """
+        upstream = None
         try:
-            # Extract the URL from the request header to determine the target server
-            first_line = request_header.split("\n")[0]
-            url = first_line.split(" ")[1]
-            http_pos = url.find("://")  # find pos of ://
-            if http_pos == -1:
-                temp = url
+            response = None
+            upstream = self._checkout_upstream(server, port)
+            if upstream:
+                try:
+                    upstream.sendall(request_header)
+                    response = self._read_response_head(upstream)
+                except OSError:
+                    pass
+                if response is None:  # The target closed the idle connection in the meantime
+                    upstream.close()
+            if response is None:
+                # The request is written right away, so the connection can carry it in the SYN
+                upstream = self._connect_upstream(server, port, fast_open=True)
+                upstream.sendall(request_header)
+                response = self._read_response_head(upstream)
+                if response is None:
+                    raise ConnectionError(f"Empty response from {server}:{port}")
+            reusable = self._relay_response(upstream, client_socket, *response, request_header.startswith(b"HEAD "))
+            if reusable and self._request_complete(request_header):
+                self._checkin_upstream(server, port, upstream)
+                upstream = None
+        except (socket.error, ValueError) as e:
+            self.log(f"Error: {e}", "server", "error", exc_info=True)
+        finally:
+            if upstream:
+                upstream.close()
+
+    def _request_complete(self, request: bytes) -> bool:
+        """Check whether the bytes forwarded to the target hold the whole request, body included.
+
+        Only the first read of the client request is forwarded. A connection that got a truncated request must not
+        be reused, the target would take the next request for the rest of the body.
+
+        :param bytes request: The bytes forwarded to the target
+        :return bool: True if the request is complete
+        """
+        head_end = request.find(b"\r\n\r\n")
+        if head_end == -1 or self.TRANSFER_ENCODING_PATTERN.search(request, 0, head_end):
+            return False
+        content_length = self.CONTENT_LENGTH_PATTERN.search(request, 0, head_end)
+        return len(request) - head_end - 4 == (int(content_length.group(1)) if content_length else 0)
+
+    def _checkout_upstream(self, host: str, port: int) -> Optional[socket.socket]:
+        """Take the most recently used idle connection to a target from the pool.
+
+        :param str host: The target host
+        :param int port: The target port
+        :return Optional[socket.socket]: An idle connection, None if there is no usable one
+        """
+        with self._upstream_pool_lock:
+            pool = self._upstream_pool.get((host, port))
+            if not pool:
+                return None
+            sock, idle_since = pool.pop()
+            self._upstream_pooled -= 1
+            if not pool:
+                del self._upstream_pool[(host, port)]
+        if time.monotonic() - idle_since < self.UPSTREAM_IDLE_TIMEOUT:
+            return sock
+        # The most recent connection expired, so did the older ones, the housekeeping closes them
+        sock.close()
+        return None
+
+    def _checkin_upstream(self, host: str, port: int, sock: socket.socket) -> None:
+        """Give an idle connection back to the pool of its target.
+
+        Expired connections are closed first, then the oldest one of the target, or of all targets, when the pool
+        is full.
+
+        :param str host: The target host
+        :param int port: The target port
+        :param socket.socket sock: The idle connection
+        """
+        now = time.monotonic()
+        with self._upstream_pool_lock:
+            evicted = self._evict_idle_upstreams(now)
+            if len(self._upstream_pool.get((host, port), ())) >= self.UPSTREAM_POOL_SIZE:
+                evicted.append(self._pop_oldest_upstream((host, port)))
+            elif self._upstream_pooled >= self.UPSTREAM_POOL_TOTAL:
+                target = min(self._upstream_pool, key=lambda target: self._upstream_pool[target][0][1])
+                evicted.append(self._pop_oldest_upstream(target))
+            self._upstream_pool.setdefault((host, port), collections.deque()).append((sock, now))
+            self._upstream_pooled += 1
+        for idle in evicted:
+            idle.close()
+
+    def _pop_oldest_upstream(self, target: Tuple[str, int]) -> socket.socket:
+        """Remove the least recently used connection to a target from the pool, with its lock held.
+
+        :param Tuple[str, int] target: The target host and port, with at least one pooled connection
+        :return socket.socket: The removed connection, to close once the lock is released
+        """
+        pool = self._upstream_pool[target]
+        sock = pool.popleft()[0]
+        self._upstream_pooled -= 1
+        if not pool:
+            del self._upstream_pool[target]
+        return sock
+
+    def _evict_idle_upstreams(self, now: float) -> list[socket.socket]:
+        """Remove the connections idle for more than UPSTREAM_IDLE_TIMEOUT from the pool, with its lock held.
+
+        :param float now: The current monotonic time
+        :return list[socket.socket]: The removed connections, to close once the lock is released
+        """
+        expired = []
+        for target, pool in list(self._upstream_pool.items()):
+            while pool and now - pool[0][1] >= self.UPSTREAM_IDLE_TIMEOUT:
+                expired.append(pool.popleft()[0])
+            if not pool:
+                del self._upstream_pool[target]
+        self._upstream_pooled -= len(expired)
+        return expired
+
+    def _read_response_head(self, upstream: socket.socket) -> Optional[Tuple[bytes, bytearray]]:
+        """Read the status line and headers of a response.
+
+        :param socket.socket upstream: The socket connected to the target
+        :return Optional[Tuple[bytes, bytearray]]: The head, blank line included, and the body bytes read past it,
+            None if the target closed the connection without answering
+        """
+        data = bytearray()
+        try:
+            head_end = self._read_until(upstream, data, b"\r\n\r\n") + 4
+        except ConnectionError:
+            if not data:
+                return None
+            raise
+        return bytes(data[:head_end]), data[head_end:]
+
+    def _relay_response(
+        self, upstream: socket.socket, client_socket: socket.socket, head: bytes, body: bytearray, head_only: bool
+    ) -> bool:
+        """Relay a response to the client, reading exactly its body when its length is known.
+
+        :param socket.socket upstream: The socket connected to the target
+        :param socket.socket client_socket: The socket from which is coming the request
+        :param bytes head: The status line and headers of the response
+        :param bytearray body: The body bytes already read with the head
+        :param bool head_only: Whether the response answers a HEAD request and has no body
+        :return bool: True if the connection to the target can be reused
+        """
+        status_line, *header_lines = head.rstrip(b"\r\n").split(b"\r\n")
+        version, status = status_line.split(b" ", 2)[:2]
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(b":")
+            headers[name.strip().lower()] = value.strip().lower()
+        connection = headers.get(b"connection", b"")
+        keep_alive = b"keep-alive" in connection if version == b"HTTP/1.0" else b"close" not in connection
+
+        client_socket.sendall(head)
+        if head_only or status in (b"204", b"304"):
+            return keep_alive and not body
+        if b"chunked" in headers.get(b"transfer-encoding", b""):
+            return self._relay_chunked(upstream, client_socket, body) and keep_alive
+        if b"content-length" in headers and not status.startswith(b"1"):
+            remaining = int(headers[b"content-length"])
+            client_socket.sendall(body[:remaining])
+            if len(body) < remaining:
+                self._relay_bytes(upstream, client_socket, remaining - len(body))
+            return keep_alive and len(body) <= remaining
+        # No framing, the body ends when the target closes the connection
+        client_socket.sendall(body)
+        self._relay_bytes(upstream, client_socket)
+        return False
+
+    def _relay_chunked(self, upstream: socket.socket, client_socket: socket.socket, body: bytearray) -> bool:
+        """Relay a chunked body up to its last chunk and trailers.
+
+        :param socket.socket upstream: The socket connected to the target
+        :param socket.socket client_socket: The socket from which is coming the request
+        :param bytearray body: The body bytes already read, consumed in place
+        :return bool: True if nothing was read past the end of the body
+        """
+        while True:
+            line_end = self._read_until(upstream, body, b"\r\n")
+            size = int(bytes(body[:line_end]).split(b";")[0], 16)
+            if size == 0:
+                body_end = self._read_until(upstream, body, b"\r\n\r\n", line_end) + 4
+                client_socket.sendall(body[:body_end])
+                return len(body) == body_end
+            chunk_end = line_end + 2 + size + 2
+            if len(body) >= chunk_end:
+                client_socket.sendall(body[:chunk_end])
+                del body[:chunk_end]
             else:
-                temp = url[(http_pos + 3) :]  # get the rest of the url
-            port_pos = temp.find(":")  # find the port pos (if any)
-
-            # Default port
-            port = 80
-            if port_pos == -1:  # default port
-                port_pos = temp.find("/")  # find the end of the server name
-                server = temp[:port_pos]
-            else:  # specific port
-                server = temp[:port_pos]
-                port = int((temp[(port_pos + 1) :])[: temp[(port_pos + 1) :].find("/")])
-
-            # Create a socket to connect to the web server
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.connect((server, port))
-            s.sendall(request_header.encode())
-            while True:
-                # receive data from web server
-                data = s.recv(4096)
-                if len(data) > 0:
-                    client_socket.send(data)  # send to browser/client
-                else:
-                    break
-            s.close()
-        except socket.error as e:
-            self.log(f"Error: {e}\n{traceback.format_exc()}", "server", "error")
+                client_socket.sendall(body)
+                self._relay_bytes(upstream, client_socket, chunk_end - len(body))
+                body.clear()
+
+    def _read_until(self, sock: socket.socket, data: bytearray, marker: bytes, start: int = 0) -> int:
+        """Receive into a buffer until it contains a marker.
 
-    def _handle_https(self, request_header: str, client_socket: socket.socket) -> None:
+        :param socket.socket sock: The socket to read from
+        :param bytearray data: The buffer to search and extend
+        :param bytes marker: The bytes to look for
+        :param int start: The position to start searching from, defaults to 0
+        :return int: The position of the marker in the buffer
+        """
+        while (position := data.find(marker, start)) == -1:
+            if len(data) > self.MAX_HEADER_SIZE:
+                raise ValueError("Response header line too long")
+            start = max(start, len(data) - len(marker) + 1)
+            chunk = sock.recv(self.RECV_SIZE)
+            if not chunk:
+                raise ConnectionError("Connection closed by the target")
+            data += chunk
+        return position
+
+    def _relay_bytes(self, upstream: socket.socket, client_socket: socket.socket, size: Optional[int] = None) -> None:
+        """Relay bytes from the target to the client, zero-copy where the platform supports it.
+
+        :param socket.socket upstream: The socket connected to the target
+        :param socket.socket client_socket: The socket from which is coming the request
+        :param Optional[int] size: The number of bytes to relay, defaults to everything until the target closes
+        """
+        pipe = self._take_splice_pipe() if hasattr(os, "splice") else None
+        if pipe:
+            relayed = False
+            try:
+                self._splice_bytes(upstream, client_socket, size, pipe)
+                relayed = True
+            finally:
+                self._give_back_splice_pipe(pipe, relayed)
+            return
+        while size is None or size > 0:
+            data = upstream.recv(self.RECV_SIZE if size is None else min(size, self.RECV_SIZE))
+            if not data:
+                if size is None:
+                    return
+                raise ConnectionError("Connection closed by the target")
+            client_socket.sendall(data)
+            if size is not None:
+                size -= len(data)
+
+    def _splice_bytes(
+        self, upstream: socket.socket, client_socket: socket.socket, size: Optional[int], pipe: Tuple[int, int]
+    ) -> None:
+        """Relay bytes between two sockets through a pipe, without copying them to user space.
+
+        The sockets have a timeout, so they are non-blocking underneath and a splice that would block waits for
+        them with poll.
+
+        :param socket.socket upstream: The socket connected to the target
+        :param socket.socket client_socket: The socket from which is coming the request
+        :param Optional[int] size: The number of bytes to relay, None for everything until the target closes
+        :param Tuple[int, int] pipe: The read and write ends of an empty pipe
+        """
+        read_fd, write_fd = pipe
+        while size is None or size > 0:
+            count = SpliceBuffer.PIPE_SIZE if size is None else min(size, SpliceBuffer.PIPE_SIZE)
+            try:
+                moved = os.splice(upstream.fileno(), write_fd, count, flags=os.SPLICE_F_MOVE)
+            except BlockingIOError:
+                self._wait_for(upstream, select.POLLIN)
+                continue
+            if not moved:
+                if size is None:
+                    return
+                raise ConnectionError("Connection closed by the target")
+            pending = moved
+            while pending:
+                try:
+                    pending -= os.splice(read_fd, client_socket.fileno(), pending, flags=os.SPLICE_F_MOVE)
+                except BlockingIOError:
+                    self._wait_for(client_socket, select.POLLOUT)
+            if size is not None:
+                size -= moved
+
+    def _take_splice_pipe(self) -> Optional[Tuple[int, int]]:
+        """Take an idle pipe for an HTTP relay, or create one if the descriptor budget allows it.
+
+        :return Optional[Tuple[int, int]]: The read and write ends of an empty pipe, None to copy through user space
+        """
+        try:
+            return self._splice_pipes.get_nowait()
+        except queue.Empty:
+            pass
+        if not self._splice_slots.acquire(blocking=False):
+            return None
+        try:
+            return os.pipe2(os.O_CLOEXEC)
+        except OSError:
+            self._splice_slots.release()
+            return None
+
+    def _give_back_splice_pipe(self, pipe: Tuple[int, int], reusable: bool) -> None:
+        """Keep a pipe for the next HTTP relay, or close it when the idle pipes are enough or it may hold bytes.
+
+        :param Tuple[int, int] pipe: The read and write ends of the pipe
+        :param bool reusable: Whether the relay emptied the pipe, False after an error
+        """
+        if reusable:
+            try:
+                self._splice_pipes.put_nowait(pipe)
+                return
+            except queue.Full:
+                pass
+        os.close(pipe[0])
+        os.close(pipe[1])
+        self._splice_slots.release()
+
+    def _new_tunnel_buffer(self) -> TunnelBuffer | SpliceBuffer:
+        """Create the buffer of one tunnel direction, zero-copy while the descriptor budget allows it.
+
+        :return TunnelBuffer | SpliceBuffer: The buffer
+        """
+        if hasattr(os, "splice") and self._splice_slots.acquire(blocking=False):
+            try:
+                return SpliceBuffer()
+            except OSError:
+                self._splice_slots.release()  # Out of file descriptors for the pipe
+        return TunnelBuffer()
+
+    def _wait_for(self, sock: socket.socket, event: int) -> None:
+        """Wait until a socket is ready, at most RELAY_TIMEOUT seconds.
+
+        :param socket.socket sock: The socket to wait for
+        :param int event: The poll event to wait for, POLLIN or POLLOUT
+        :raises TimeoutError: If the socket did not become ready in time
+        """
+        poller = select.poll()
+        poller.register(sock, event)
+        if not poller.poll(self.RELAY_TIMEOUT * 1000):
+            raise TimeoutError(f"No progress within {self.RELAY_TIMEOUT:g} seconds")
+
+    def _handle_https(self, target: str, port: int, client_socket: socket.socket, early_data: bytes = b"") -> bool:
         """Handle HTTPS CONNECT requests.
 
-        :param str request_header: The header of the incoming http request
+        :param str target: The target host
+        :param int port: The target port
         :param socket.socket client_socket: The socket from which is coming the request
+        :param bytes early_data: Bytes the client sent right after the CONNECT header, defaults to none
+        :return bool: True if the connection was handed over to the tunnel event loop
         """
         try:
-            target = request_header.split(" ")[1].split(":")[0]
-            port = int(request_header.split(" ")[1].split(":")[1])
-
-            # Establish a connection to the target
-            server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            server_socket.connect((target, port))
-            client_socket.sendall(b"HTTP/1.1 200 Connection Established\r\n\r\n")
-            self._tunnel_data(client_socket, server_socket)
+            server_socket = self._connect_upstream(target, port)
+            self._open_tunnel(client_socket, server_socket, early_data)
+            return True
         except socket.gaierror as e:
             self.log(f"DNS resolution error: {e}", "server", "error")
-            client_socket.close()
         except Exception as e:
-            self.log(f"HTTPS handling error: {e}\n{traceback.format_exc()}", "server", "error")
-            client_socket.close()
+            self.log(f"HTTPS handling error: {e}", "server", "error", exc_info=True)
+        return False
+
+    def _resolve(self, host: str) -> str:
+        """Resolve a host name to an IPv4 address, caching the answer for DNS_CACHE_TTL seconds.
+
+        :param str host: The host name to resolve
+        :return str: The IPv4 address of the host
+        """
+        now = time.monotonic()
+        cached = self._dns.get(host)
+        if cached and cached[1] > now:
+            return cached[0]
+        address = socket.getaddrinfo(host, None, socket.AF_INET, socket.SOCK_STREAM)[0][4][0]
+        if len(self._dns) >= self.DNS_CACHE_SIZE:
+            self._dns.clear()
+        self._dns[host] = (address, now + self.DNS_CACHE_TTL)
+        return address
+
+    def _connect_upstream(self, host: str, port: int, fast_open: bool = False) -> socket.socket:
+        """Open a tuned TCP connection to a target.
+
+        With TCP Fast Open the handshake is deferred to the first write, so it is only suitable when the proxy
+        writes first. Tunnels must not use it since the target may be the one to speak first.
+
+        :param str host: The target host
+        :param int port: The target port
+        :param bool fast_open: Whether to try TCP Fast Open, defaults to False
+        :return socket.socket: The connected socket
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(self.RELAY_TIMEOUT)
+            self._tune_socket(sock)
+            if fast_open and sys.platform == "linux":
+                try:
+                    sock.setsockopt(socket.IPPROTO_TCP, TCP_FASTOPEN_CONNECT, 1)
+                except OSError:
+                    pass  # Kernel without client side Fast Open
+            sock.connect((self._resolve(host), port))
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    def _open_tunnel(self, client_socket: socket.socket, server_socket: socket.socket, early_data: bytes) -> None:
+        """Hand a connected client/server pair over to the event loop.
 
-    def _tunnel_data(self, client_socket: socket.socket, server_socket: socket.socket) -> None:
-        """Tunnel data between client and server sockets.
+        The sockets are registered by the event loop thread itself, which is woken up through a socket pair. The
+        CONNECT reply is queued rather than sent here, so the event loop writes it together with whatever the
+        target already sent by the time the client is writable.
 
         :param socket.socket client_socket: The socket from which is coming the request
-        :param socket.socket server_socket: The socket of the proxy server
-        """
-        sockets_list = [client_socket, server_socket]
-        keep_alive = True
-        while keep_alive:
-            read_sockets, _, error_sockets = select.select(sockets_list, [], sockets_list, None)
-            if error_sockets:
-                keep_alive = False
-            for sock in read_sockets:
-                if sock is client_socket:
-                    data = client_socket.recv(4096)
-                    if data:
-                        server_socket.sendall(data)
-                    else:
-                        keep_alive = False
-                elif sock is server_socket:
-                    data = server_socket.recv(4096)
-                    if data:
-                        client_socket.sendall(data)
-                    else:
-                        keep_alive = False
+        :param socket.socket server_socket: The socket connected to the target
+        :param bytes early_data: Bytes the client sent right after the CONNECT header
+        """
+        client_socket.setblocking(False)
+        server_socket.setblocking(False)
+        tunnel = TunnelPair(client_socket, server_socket, self._new_tunnel_buffer(), self._new_tunnel_buffer())
+        tunnel.buf_s2c.load(self.CONNECT_REPLY)
+        tunnel.buf_c2s.load(early_data)
+        self._pending_tunnels.put(tunnel)
+        try:
+            self._wakeup_send.send(b"\0")
+        except BlockingIOError:
+            pass  # A wakeup is already pending
+
+    def _register_pending_tunnels(self, wakeup_socket: socket.socket) -> None:
+        """Start watching the tunnels handed over by the request threads.
+
+        :param socket.socket wakeup_socket: The wakeup socket reported as readable
+        """
+        try:
+            while wakeup_socket.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        while not self._pending_tunnels.empty():
+            self._update_tunnel(self._pending_tunnels.get())
+
+    def _relay_tunnel(self, sock: socket.socket, tunnel: TunnelPair, events: int) -> None:
+        """Move data between the two ends of a tunnel after one of them became ready.
+
+        :param socket.socket sock: The tunnel end reported as ready
+        :param TunnelPair tunnel: The tunnel the socket belongs to
+        :param int events: The selector events reported for the socket
+        """
+        if tunnel.state == "closed":
+            return  # Closed by an earlier event of the same select batch
+        if sock is tunnel.client_sock:
+            peer, inbound, outbound = tunnel.upstream_sock, tunnel.buf_c2s, tunnel.buf_s2c
+        else:
+            peer, inbound, outbound = tunnel.client_sock, tunnel.buf_s2c, tunnel.buf_c2s
+        try:
+            # A saturated buffer means the socket still holds data, so the kernel can wait for it to fill a segment
+            if events & selectors.EVENT_READ:
+                if not inbound.fill(sock):
+                    tunnel.state = "closing"
+                inbound.flush(peer, inbound.saturated)
+            if events & selectors.EVENT_WRITE:
+                outbound.flush(sock, outbound.saturated)
+        except OSError as e:
+            self.log(f"Tunnel error: {e}", "server", "error")
+            tunnel.state = "failed"
+        self._update_tunnel(tunnel)
+
+    def _update_tunnel(self, tunnel: TunnelPair) -> None:
+        """Adjust the events watched on both ends of a tunnel, closing it once nothing is left to relay.
+
+        :param TunnelPair tunnel: The tunnel to update
+        """
+        pending = tunnel.buf_c2s.pending or tunnel.buf_s2c.pending
+        if tunnel.state == "failed" or (tunnel.state == "closing" and not pending):
+            self._close_tunnel(tunnel)
+            return
+        reading = tunnel.state == "open"
+        self._watch(tunnel.client_sock, tunnel, reading and not tunnel.buf_c2s.full, bool(tunnel.buf_s2c.pending))
+        self._watch(tunnel.upstream_sock, tunnel, reading and not tunnel.buf_s2c.full, bool(tunnel.buf_c2s.pending))
+
+    def _watch(self, sock: socket.socket, tunnel: TunnelPair, read: bool, write: bool) -> None:
+        """Register, modify or unregister a tunnel end in the selector.
+
+        :param socket.socket sock: The tunnel end
+        :param TunnelPair tunnel: The tunnel the socket belongs to
+        :param bool read: Whether to wait for the socket to be readable
+        :param bool write: Whether to wait for the socket to be writable
+        """
+        events = (selectors.EVENT_READ if read else 0) | (selectors.EVENT_WRITE if write else 0)
+        key = self._selector.get_map().get(sock)
+        if key is None:
+            if events:
+                self._selector.register(sock, events, tunnel)
+        elif not events:
+            self._selector.unregister(sock)
+        elif key.events != events:
+            self._selector.modify(sock, events, tunnel)
+
+    def _close_tunnel(self, tunnel: TunnelPair) -> None:
+        """Stop watching and close both ends of a tunnel, once.
+
+        :param TunnelPair tunnel: The tunnel to close
+        """
+        if tunnel.state == "closed":
+            return
+        tunnel.state = "closed"
+        for sock in (tunnel.client_sock, tunnel.upstream_sock):
+            if sock in self._selector.get_map():
+                self._selector.unregister(sock)
+            sock.close()
+        for buffer in (tunnel.buf_c2s, tunnel.buf_s2c):
+            buffer.close()
+            if isinstance(buffer, SpliceBuffer):
+                self._splice_slots.release()
 
     def _authenticate_user(self, username: str, password: str) -> bool:
         """Authenticate a user by username and hashed password.
@@ -301,40 +1177,40 @@ class ProxyServer:
         :param str password: The password of the user
         :return bool: True or False depending if the authencation suceeded
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT password FROM users WHERE username = ?", (username,))
-            result = cursor.fetchone()
-            if result:
-                stored_password = result[0]
-                salt = bytes.fromhex(stored_password[-32:])
-                password_hash, _ = self._hash_password(password, salt)
-                return stored_password[:-32] == password_hash
-            return False
+        with self._auth_lock:
+            result = self._auth_conn.execute("SELECT password FROM users WHERE username = ?", (username,)).fetchone()
+        if result:
+            stored_password = result[0]
+            salt = bytes.fromhex(stored_password[-32:])
+            legacy = not stored_password.startswith(self.SCRYPT_PREFIX)
+            password_hash, _ = self._hash_password(password, salt, legacy)
+            return stored_password[:-32] == password_hash
+        return False
 
     def _run_command_interface(self) -> None:
         """Run the command-line interface for interacting with the server."""
         self.log(f"\n 🖥️  Welcome on the CLI, enter help to see the commands\n", "cli")
-        help = "\n 💡 Available commands:\n  - add-user\n  - show-logs\n  - exit\n"
+        help = "\n 💡 Available commands:\n" + "".join(f"  - {name}\n" for name in self._commands)
         while True:
             command = input("> ").strip().lower()
-            if command == "add-user":
-                self._execute_add_user_command()
-            elif command == "exit":
-                self._cleanup_and_exit()
-            elif command == "show-logs":
-                self._show_logs()
+            handler = self._commands.get(command)
+            if handler:
+                handler()
             elif command == "help":
                 self.log(help, "cli")
             else:
                 self.log("Invalid command. Please try again.", "cli", "error")
 
     def _cleanup_and_exit(self) -> None:
-        """Cleanup resources, close log tailing windows, and exit."""
+        """Cleanup resources and exit."""
         self.log(" 🟥 Server closed", "server")
+        self._workers.shutdown(wait=False, cancel_futures=True)
         open(self.log_path, "w").close()
-        if os.path.exists(self.db_path):
-            os.remove(self.db_path)
+        if self._auth_conn:
+            self._auth_conn.close()
+        for path in (self.db_path, f"{self.db_path}-wal", f"{self.db_path}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
         self.log(" 🟥 Server startup cancelled.", "cli")
         sys.exit(0)
 
@@ -348,14 +1224,32 @@ class ProxyServer:
             self.log(" 💡 User authentication is deactivated. No need to create any users.", "cli")
 
     def _show_logs(self) -> None:
-        """Open a new terminal window to tail the server.log file."""
-        if platform.system() == "Linux":
-            try:
-                subprocess.call(["gnome-terminal", "--", "tail", "-f", self.log_path])
-            except Exception as e:
-                self.log(f"Failed to open log tailing terminal: {e}", "cli", "error")
-        else:
-            self.log("The 'show-logs' command is not available on the current platform.", "cli", "error")
+        """Print new server.log lines to the CLI from a background thread until hide-logs."""
+        if self._log_tail_stop and not self._log_tail_stop.is_set():
+            self.log(" 💡 Logs are already shown, enter hide-logs to stop.", "cli")
+            return
+        self._log_tail_stop = threading.Event()
+        threading.Thread(target=self._tail_logs, args=(self._log_tail_stop,), name="log-tail", daemon=True).start()
+
+    def _hide_logs(self) -> None:
+        """Stop printing server.log lines to the CLI."""
+        if self._log_tail_stop:
+            self._log_tail_stop.set()
+
+    def _tail_logs(self, stop: threading.Event) -> None:
+        """Follow the end of server.log and write each new line to stdout.
+
+        :param threading.Event stop: Set to stop following the log
+        """
+        with open(self.log_path, "rb") as log_file:
+            log_file.seek(0, os.SEEK_END)
+            while not stop.is_set():
+                line = log_file.readline()
+                if not line:
+                    time.sleep(0.1)
+                    continue
+                sys.stdout.write(line.decode(errors="replace"))
+                sys.stdout.flush()
 
     def _get_local_ip(self) -> str:
         """Get the local ip of the current machine
@@ -372,23 +1266,63 @@ class ProxyServer:
             self.log(f"Error: {e}", "cli")
 
     def _get_public_ip(self) -> str:
-        """Fetch the current public IP address using an external service.
+        """Fetch the current public IP address, reusing the one cached on disk during the last hour.
+
+        :return str: The public ip of the modem
+        """
+        cache_path = os.path.join(os.path.expanduser("~"), ".cache", "delpha_proxy", "public_ip")
+        try:
+            if time.time() - os.path.getmtime(cache_path) < self.PUBLIC_IP_CACHE_TTL:
+                with open(cache_path) as file:
+                    return str(ipaddress.ip_address(file.read().strip()))
+        except (OSError, ValueError):
+            pass
+        public_ip = self._query_public_ip()
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, "w") as file:
+                file.write(public_ip)
+        except OSError as e:
+            self.log(f"Could not cache public IP: {e}", "cli", "warning")
+        return public_ip
+
+    def _query_public_ip(self) -> str:
+        """Ask an external service for the public IP address.
+
+        A raw plain HTTP request to ipify is tried first to avoid the TLS handshake, then ifconfig.me over HTTPS.
 
         :return str: The public ip of the modem
         """
         try:
-            response = requests.get("https://ifconfig.me")
-            return response.text
+            with socket.create_connection(("api.ipify.org", 80), timeout=5) as s:
+                s.sendall(b"GET / HTTP/1.0\r\nHost: api.ipify.org\r\n\r\n")
+                response = bytearray()
+                while chunk := s.recv(4096):
+                    response += chunk
+            status_line, _, rest = bytes(response).partition(b"\r\n")
+            if status_line.split(b" ")[1:2] == [b"200"]:
+                return str(ipaddress.ip_address(rest.partition(b"\r\n\r\n")[2].decode().strip()))
+        except (OSError, ValueError, UnicodeDecodeError):
+            pass
+
+        # Only imported on this fallback path, it is the slowest dependency to load
+        import requests
+
+        try:
+            response = requests.get("https://ifconfig.me", timeout=5)
+            return response.text.strip()
         except requests.RequestException as e:
             self.log(f"Error fetching public IP: {e}", "cli", "error")
             sys.exit(1)
 
-    def log(self, msg: str, name: str, level: str = "info") -> None:
+    def log(self, msg: str, name: str, level: str = "info", exc_info: bool = False) -> None:
         """Log a message with a given level.
 
         :param str msg: The message to log
         :param str name: The name of the log destination
         :param str level: The log level, defaults to "info"
+        :param bool exc_info: Attach the exception being handled to server logs, formatted only if the record is
+            emitted, defaults to False
         """
         if name == "cli":
             if level == "info":
@@ -399,11 +1333,11 @@ class ProxyServer:
                 print(f" ⚠️  {msg}")
         elif name == "server":
             if level == "info":
-                logging.info(msg)
+                logging.info(msg, exc_info=exc_info)
             elif level == "error":
-                logging.error(f" ❌ {msg}")
+                logging.error(f" ❌ {msg}", exc_info=exc_info)
             else:
-                logging.warning(f" ⚠️  {msg}")
+                logging.warning(f" ⚠️  {msg}", exc_info=exc_info)
 
     def add_user(self, username: str, password: str) -> None:
         """Add a new user with a username and hashed password to the database.
@@ -424,17 +1358,23 @@ class ProxyServer:
         except sqlite3.IntegrityError:
             self.log(" 💡 User already exists.\n", "cli", "warning")
 
-    def _hash_password(self, password: str, salt: Optional[bytes] = None) -> Tuple[str, bytes]:
+    def _hash_password(self, password: str, salt: Optional[bytes] = None, legacy: bool = False) -> Tuple[str, bytes]:
         """Hash a password with a given salt, or generate one if not provided.
 
+        Passwords are hashed with scrypt, prefixed with SCRYPT_PREFIX so that hashes stored by former versions
+        with PBKDF2-SHA256 can still be verified.
+
         :param str password: The password to hash
         :param Optional[bytes] salt: The salt to use for randomization, defaults generate a new one
-        :return Tuple[str, bytes]: _description_
+        :param bool legacy: Hash with the former PBKDF2-SHA256 scheme, defaults to False
+        :return Tuple[str, bytes]: The hex encoded hash and the salt used
         """
         if salt is None:
             salt = os.urandom(16)
-        pwdhash = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, 100000)
-        return pwdhash.hex(), salt
+        if legacy:
+            return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, 100000).hex(), salt
+        pwdhash = hashlib.scrypt(password.encode(), salt=salt, n=16384, r=8, p=1, dklen=32)
+        return self.SCRYPT_PREFIX + pwdhash.hex(), salt
 
     def __str__(self) -> str:
         """Return a summary of the configured settings of the proxy server.
@@ -449,6 +1389,7 @@ class ProxyServer:
             f"|  Public Host: {self.public_host}\n"
             f"|  Local Host: {self.local_host}\n"
             f"|  Port: {port}\n"
+            f"|  Worker Processes: {self.worker_processes}\n"
             f"|  Authentication: {auth_status}\n"
             f"|  Database Path: {self.db_path}\n\n"
         )